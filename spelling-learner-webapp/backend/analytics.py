@@ -0,0 +1,222 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Analytics configuration
+ANALYTICS_CACHE_SECONDS = float(os.getenv('ANALYTICS_CACHE_SECONDS', '60'))
+LOAD_CHUNK_SIZE = 50000  # Rows per read, keeps each read lock on the live database short
+PENDING_WINDOW = timedelta(hours=1)  # Unfinished tasks younger than this are re-read on refresh
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+# Stands in for task user ids that are not integers; never matches a real or requested user
+UNKNOWN_USER = -1
+
+
+class TaskHistory:
+    """Columnar copy of the tasks table, loaded incrementally from a read-only connection"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.ids = np.empty(0, dtype=np.int64)
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.combo_ids = np.empty(0, dtype=np.int64)
+        self.days = np.empty(0, dtype='datetime64[D]')
+        self.completed = np.empty(0, dtype=bool)
+        self.correct = np.empty(0, dtype=bool)
+        self.combo_words = {}
+        self._reload_from = 0
+
+    def get_connection(self):
+        """Open a read-only connection so analytics can never write to the live database"""
+        return sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+
+    def refresh(self):
+        """Load new tasks and re-read recent unfinished ones (their result may have changed)"""
+        conn = self.get_connection()
+        try:
+            self.combo_words = dict(conn.execute('''
+                SELECT c.id, LOWER(w.text)
+                FROM combos c
+                JOIN words w ON c.word_id = w.id
+            ''').fetchall())
+
+            chunks = []
+            last_id = self._reload_from - 1
+            while True:
+                # /api/puzzle stores user_id as given, so anything that is not an integer is UNKNOWN_USER
+                rows = conn.execute('''
+                    SELECT id, CASE WHEN typeof(user_id) = 'integer' THEN user_id ELSE ? END, combo_id, SUBSTR(date, 1, 10), completed, correct
+                    FROM tasks
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (UNKNOWN_USER, last_id, LOAD_CHUNK_SIZE)).fetchall()
+                if not rows:
+                    break
+                chunks.append(rows)
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+
+        # Drop the rows being re-read, then append everything that was loaded
+        keep = np.searchsorted(self.ids, self._reload_from)
+        columns = [[self.ids[:keep]], [self.user_ids[:keep]], [self.combo_ids[:keep]],
+                   [self.days[:keep]], [self.completed[:keep]], [self.correct[:keep]]]
+        dtypes = [np.int64, np.int64, np.int64, 'datetime64[D]', bool, bool]
+        for rows in chunks:
+            for column, values, dtype in zip(columns, zip(*rows), dtypes):
+                column.append(np.array(values, dtype=dtype))
+        (self.ids, self.user_ids, self.combo_ids,
+         self.days, self.completed, self.correct) = [np.concatenate(column) for column in columns]
+
+        self._reload_from = self._next_reload_point()
+
+    def _next_reload_point(self):
+        """First task id that still has to be read on the next refresh"""
+        if len(self.ids) == 0:
+            return 0
+        cutoff = np.datetime64((datetime.now() - PENDING_WINDOW).date())
+        pending = self.ids[~self.completed & (self.days >= cutoff)]
+        if len(pending):
+            return int(pending[0])
+        return int(self.ids[-1]) + 1
+
+
+def _accuracy(correct, attempts):
+    return np.round(np.divide(correct, attempts, out=np.zeros(len(attempts)), where=attempts > 0), 4)
+
+
+def build_report(history, user_ids=None, limit=20, min_attempts=3, weeks=12):
+    """Compute school-wide aggregates over completed tasks in vectorized passes"""
+    # Catalog: one index per distinct word, looked up by combo id
+    combo_ids = np.fromiter(history.combo_words.keys(), dtype=np.int64, count=len(history.combo_words))
+    words, combo_word = np.unique(np.array(list(history.combo_words.values()), dtype=str), return_inverse=True)
+    lookup = np.full(int(combo_ids.max(initial=0)) + 1, -1, dtype=np.int64)
+    lookup[combo_ids] = combo_word
+
+    # Tasks that were answered and whose puzzle still exists
+    selected = np.ones(len(history.ids), dtype=bool)
+    if user_ids is not None:
+        selected = (np.isin(history.user_ids, np.array(user_ids, dtype=np.int64))
+                    & (history.user_ids != UNKNOWN_USER))
+    mask = selected & history.completed & (history.combo_ids < len(lookup))
+    word_idx = np.full(len(mask), -1, dtype=np.int64)
+    word_idx[mask] = lookup[history.combo_ids[mask]]
+    mask &= word_idx >= 0
+    word_idx = word_idx[mask]
+    correct = history.correct[mask].astype(np.float64)
+    days = history.days[mask]
+
+    # Hardest words
+    attempts = np.bincount(word_idx, minlength=len(words))
+    hits = np.bincount(word_idx, weights=correct, minlength=len(words))
+    accuracy = _accuracy(hits, attempts)
+    eligible = np.flatnonzero(attempts >= min_attempts)
+    order = eligible[np.lexsort((-attempts[eligible], accuracy[eligible]))][:limit]
+    hardest_words = [
+        {'word': str(words[i]), 'attempts': int(attempts[i]), 'accuracy': float(accuracy[i])}
+        for i in order
+    ]
+
+    # Accuracy by word length
+    lengths = np.char.str_len(words).astype(np.int64)
+    task_lengths = lengths[word_idx]
+    attempts = np.bincount(task_lengths)
+    hits = np.bincount(task_lengths, weights=correct, minlength=len(attempts))
+    accuracy = _accuracy(hits, attempts)
+    by_length = [
+        {'length': int(n), 'attempts': int(attempts[n]), 'accuracy': float(accuracy[n])}
+        for n in np.flatnonzero(attempts)
+    ]
+
+    # Accuracy by letter and position within the word (letter code 0 means no letter)
+    max_length = int(lengths.max(initial=0))
+    letters = np.zeros((len(words), max_length), dtype=np.int64)
+    for i, word in enumerate(words):
+        letters[i, :len(word)] = [ALPHABET.find(ch) + 1 for ch in word]
+    width = len(ALPHABET) + 1
+    attempts = np.zeros(max_length * width, dtype=np.int64)
+    hits = np.zeros(max_length * width)
+    for position in range(max_length):
+        codes = letters[word_idx, position]
+        present = codes > 0
+        keys = position * width + codes[present]
+        attempts += np.bincount(keys, minlength=len(attempts))
+        hits += np.bincount(keys, weights=correct[present], minlength=len(hits))
+    accuracy = _accuracy(hits, attempts)
+    eligible = np.flatnonzero(attempts >= min_attempts)
+    order = eligible[np.lexsort((-attempts[eligible], accuracy[eligible]))][:limit]
+    by_letter_position = [
+        {
+            'position': int(k // width),
+            'letter': ALPHABET[k % width - 1],
+            'attempts': int(attempts[k]),
+            'accuracy': float(accuracy[k])
+        }
+        for k in order
+    ]
+
+    # Weekly trend (weeks start on Monday; 1970-01-01 was a Thursday)
+    day_numbers = days.astype(np.int64)
+    week_starts = day_numbers - (day_numbers + 3) % 7
+    week_values, week_idx = np.unique(week_starts, return_inverse=True)
+    attempts = np.bincount(week_idx, minlength=len(week_values))
+    hits = np.bincount(week_idx, weights=correct, minlength=len(week_values))
+    accuracy = _accuracy(hits, attempts)
+    weekly_trend = [
+        {
+            'week_start': str(np.datetime64(int(week_values[i]), 'D')),
+            'attempts': int(attempts[i]),
+            'accuracy': float(accuracy[i])
+        }
+        for i in range(len(week_values))
+    ][-weeks:]
+
+    return {
+        'overall': {
+            'total': int(selected.sum()),
+            'completed': int(len(word_idx)),
+            'correct': int(correct.sum()),
+            'users': int(len(np.setdiff1d(history.user_ids[mask], [UNKNOWN_USER])))
+        },
+        'hardest_words': hardest_words,
+        'by_length': by_length,
+        'by_letter_position': by_letter_position,
+        'weekly_trend': weekly_trend
+    }
+
+
+class AnalyticsEngine:
+    """Keeps the task history in memory and caches computed reports"""
+
+    def __init__(self, db_path, cache_seconds=ANALYTICS_CACHE_SECONDS):
+        self.history = TaskHistory(db_path)
+        self.cache_seconds = cache_seconds
+        self._cache = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def get_report(self, user_ids=None, limit=20, min_attempts=3, weeks=12):
+        """Return a cached report, refreshing the history once the cache has expired"""
+        # None means every user; an empty list (e.g. an empty classroom) means nobody
+        key = (tuple(sorted(set(user_ids))) if user_ids is not None else None, limit, min_attempts, weeks)
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded_at is None or now - self._loaded_at >= self.cache_seconds:
+                self.history.refresh()
+                self._cache = {}
+                self._loaded_at = now
+
+            if key not in self._cache:
+                start = time.perf_counter()
+                selected = list(key[0]) if key[0] is not None else None
+                report = build_report(self.history, selected, limit, min_attempts, weeks)
+                report['generated_at'] = datetime.now().isoformat()
+                report['compute_ms'] = round((time.perf_counter() - start) * 1000, 3)
+                self._cache[key] = report
+            return self._cache[key]
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
 import random
@@ -11,9 +11,17 @@ sys.path.insert(0, data_path)
 
 # Import the database module
 from database import SpellingBeeDatabase
+from profiling import init_profiling
+from analytics import AnalyticsEngine
+from catalog_snapshot import CatalogStore
+from image_scanner import scan_images
+from responses import jsonify, init_compression
+from events import EventBus, stream_events
 
 app = Flask(__name__)
 CORS(app, origins=["http://192.168.1.99:3000", "http://localhost:3000"])
+# Catalog-style endpoints whose bodies repeat are kept precompressed
+init_compression(app, cached_endpoints=['get_difficulty_levels', 'get_all_puzzles', 'get_analytics'])
 
 # Setup paths
 IMAGES_FOLDER = '/app/data/images'  # Direct path to mounted volume
@@ -35,6 +43,20 @@ os.makedirs(IMAGES_FOLDER, exist_ok=True)
 # Initialize database
 db = SpellingBeeDatabase(DB_PATH)
 
+# Memory-mapped puzzle catalog shared by all workers
+# Always rebuilt at startup, since the database may have changed while the app was down
+catalog = CatalogStore()
+catalog.refresh(db)
+
+# Live progress events for /api/events subscribers
+events = EventBus()
+
+# Classroom analytics over task history (read-only, cached)
+analytics = AnalyticsEngine(DB_PATH)
+
+# Optional request profiling (see profiling.py for PROFILE_* settings)
+init_profiling(app, db)
+
 # Routes
 @app.route('/api/difficulty', methods=['GET'])
 def get_difficulty_levels():
@@ -55,7 +77,10 @@ def get_puzzle():
     recent_combos = db.get_recent_combos(user_id)
     
     # Get a word/image combo of the selected difficulty
-    combo = db.get_puzzle_combo(difficulty, recent_combos)
+    combo = catalog.get_puzzle_combo(difficulty, recent_combos)
+    if not combo:
+        # Fall back to the database if the snapshot is unavailable
+        combo = db.get_puzzle_combo(difficulty, recent_combos)
     
     if not combo:
         return jsonify({'error': 'No puzzles found for this difficulty level'}), 404
@@ -131,6 +156,12 @@ def submit_answer():
         db.reset_user_progress(user_id)
         consecutive_correct = 0
     
+    # Notify live subscribers (teacher dashboards, other tabs)
+    events.publish('submit', user_id, {'task_id': task_id, 'word': original_word, 'correct': is_correct})
+    events.publish('progress', user_id, {'consecutive_correct': consecutive_correct})
+    if celebration:
+        events.publish('celebration', user_id, {})
+    
     return jsonify({
         'correct': is_correct,
         'message': 'Correct! Great job!' if is_correct else f'Not quite! The word was "{original_word}".',
@@ -144,6 +175,36 @@ def get_progress():
     consecutive_correct = db.get_user_progress(user_id)
     return jsonify({'consecutive_correct': consecutive_correct})
 
+@app.route('/api/events', methods=['GET'])
+def get_events():
+    """Server-Sent Events stream of submit, progress and celebration events"""
+    user_id = request.args.get('user_id')
+    classroom = request.args.get('classroom')
+    if user_id is not None and classroom is not None:
+        return jsonify({'error': 'Pass either user_id or classroom, not both'}), 400
+    
+    # Filter by one user, by classroom, or (for admins) no filter at all
+    if user_id is not None:
+        user_ids = [user_id]
+    elif classroom is not None:
+        user_ids = db.get_classroom_user_ids(classroom)
+    else:
+        user_ids = None
+    
+    subscription = events.subscribe(user_ids)
+    
+    # Start single-user streams with the current progress so clients need no initial poll
+    initial_events = []
+    if user_id is not None:
+        progress = {'consecutive_correct': db.get_user_progress(user_id)}
+        initial_events.append(events.create_event('progress', user_id, progress))
+    
+    return Response(
+        stream_with_context(stream_events(subscription, events, initial_events)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/images/<path:filename>')
 def get_image(filename):
     print(f"DEBUG: Requested image: {filename}", flush=True)
@@ -177,6 +238,58 @@ def get_all_puzzles():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/analytics', methods=['GET'])
+def get_analytics():
+    """Get school-wide analytics (hardest words, accuracy by length/letter, weekly trend)"""
+    if 'user_ids' in request.args and 'classroom' in request.args:
+        return jsonify({'error': 'Pass either user_ids or classroom, not both'}), 400
+    
+    user_ids = None
+    if 'user_ids' in request.args:
+        try:
+            user_ids = [int(u) for u in request.args['user_ids'].split(',') if u]
+        except ValueError:
+            return jsonify({'error': 'user_ids must be a comma-separated list of numbers'}), 400
+    
+    limit = request.args.get('limit', 20, type=int)
+    min_attempts = request.args.get('min_attempts', 3, type=int)
+    weeks = request.args.get('weeks', 12, type=int)
+    if limit < 1 or weeks < 1 or min_attempts < 0:
+        return jsonify({'error': 'limit and weeks must be at least 1, min_attempts at least 0'}), 400
+    
+    try:
+        if 'classroom' in request.args:
+            user_ids = db.get_classroom_user_ids(request.args['classroom'])
+        
+        report = analytics.get_report(user_ids, limit, min_attempts, weeks)
+        return jsonify(report)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/users', methods=['GET'])
+def get_users():
+    """Get all users with their classroom"""
+    try:
+        return jsonify(db.get_all_users())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/users/<int:user_id>/classroom', methods=['PUT'])
+def set_user_classroom(user_id):
+    """Assign a user to a classroom (null removes them from their classroom)"""
+    try:
+        data = request.json or {}
+        if 'classroom' not in data:
+            return jsonify({'error': 'classroom is required'}), 400
+        classroom = data['classroom']
+        if classroom is not None and not (isinstance(classroom, str) and classroom.strip()):
+            return jsonify({'error': 'classroom must be a non-empty string or null'}), 400
+        
+        db.set_user_classroom(user_id, data['classroom'])
+        return jsonify({'success': True, 'user_id': user_id, 'classroom': data['classroom']})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/admin/puzzles', methods=['POST'])
 def add_puzzle():
     """Add a new puzzle"""
@@ -191,6 +304,7 @@ def add_puzzle():
             return jsonify({'error': 'All fields are required'}), 400
         
         combo_id = db.add_puzzle(word, difficulty, image_name, image_description)
+        catalog.refresh(db)
         return jsonify({'success': True, 'combo_id': combo_id})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -209,6 +323,7 @@ def update_puzzle(combo_id):
             return jsonify({'error': 'All fields are required'}), 400
         
         db.update_puzzle(combo_id, word, difficulty, image_name, image_description)
+        catalog.refresh(db)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -218,6 +333,7 @@ def delete_puzzle(combo_id):
     """Delete a puzzle"""
     try:
         db.delete_puzzle(combo_id)
+        catalog.refresh(db)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -260,6 +376,7 @@ def upload_auto_puzzle():
         
         # Create puzzle automatically based on filename
         combo_id = db.add_puzzle_from_image(filename)
+        catalog.refresh(db)
         
         # Extract word and difficulty for response
         word = os.path.splitext(filename)[0].lower()
@@ -276,6 +393,23 @@ def upload_auto_puzzle():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/images/scan', methods=['POST'])
+def scan_image_library():
+    """Check image files against the database; pass {"repair": true} to fix problems"""
+    data = request.get_json(silent=True) or {}
+    repair = bool(data.get('repair'))
+    try:
+        report = scan_images(db, IMAGES_FOLDER, repair=repair)
+        if report.get('repair_error'):
+            return jsonify(dict(report, error=report['repair_error'])), 500
+        return jsonify(report)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        # Repairs commit one by one, so republish even if the scan stopped part way
+        if repair:
+            catalog.refresh(db)
+
 if __name__ == '__main__':
     print("="*50)
     print("DEBUG: Flask app starting up!")
@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+import time
+
+# Run inside the backend container (or anywhere /app/data is available)
+import flask
+import app as backend
+from responses import jsonify, orjson, brotli
+
+# Read-only endpoints (/api/puzzle is left out because it records a task)
+ENDPOINTS = [
+    '/api/difficulty',
+    '/api/progress?user_id=1',
+    '/api/stats?user_id=1',
+    '/api/admin/puzzles',
+    '/api/admin/analytics',
+]
+
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', '2000'))
+
+
+def time_per_call(func, data):
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        func(data)
+    return (time.process_time() - start) / ITERATIONS * 1e6
+
+
+def bytes_sent(client, endpoint, encoding):
+    """Size of the body the app actually sends for the given Accept-Encoding"""
+    response = client.get(endpoint, headers={'Accept-Encoding': encoding})
+    if encoding != 'identity' and response.headers.get('Content-Encoding') != encoding:
+        return f"{len(response.data)}*"
+    return len(response.data)
+
+
+def main():
+    client = backend.app.test_client()
+    print(f"Fast serializer: {'orjson' if orjson else 'not installed (Flask encoder)'}; "
+          f"brotli: {'yes' if brotli else 'not installed'}; {ITERATIONS} iterations")
+    print(f"{'endpoint':<26}{'flask us':>10}{'fast us':>9}{'raw B':>9}{'gzip B':>9}{'br B':>9}")
+
+    for endpoint in ENDPOINTS:
+        data = json.loads(client.get(endpoint, headers={'Accept-Encoding': 'identity'}).data)
+
+        # Both sides build a full response, as the routes do
+        with backend.app.app_context():
+            flask_us = time_per_call(flask.jsonify, data)
+            fast_us = time_per_call(jsonify, data)
+
+        sizes = [bytes_sent(client, endpoint, encoding) for encoding in ('identity', 'gzip', 'br')]
+        print(f"{endpoint.split('?')[0]:<26}{flask_us:>10.1f}{fast_us:>9.1f}"
+              + ''.join(f"{size:>9}" for size in sizes))
+
+    print("* sent uncompressed (body below COMPRESS_MIN_SIZE or encoding unavailable)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+from array import array
+
+# Catalog snapshot configuration
+CATALOG_DIR = os.getenv('CATALOG_DIR', '/app/data/catalog')
+CATALOG_KEEP = 3  # Generations kept on disk (workers may still have older ones mapped)
+
+POINTER_FILE = 'CURRENT'
+MAGIC = b'SBCAT002'
+
+# Header: magic, generation, rows, difficulty count, then the byte offset of each section
+HEADER = struct.Struct('<8sQII9Q')
+SECTIONS = ('combo_ids', 'difficulty', 'buckets', 'difficulty_names',
+            'word_offsets', 'image_offsets', 'desc_offsets', 'nulls', 'strings')
+
+# Bits in the per-row 'nulls' section, set when the column is NULL in the database
+NULL_WORD, NULL_IMAGE, NULL_DESC = 1, 2, 4
+
+
+def _pack_strings(values):
+    """Pack strings into one UTF-8 blob plus an offsets array (len(values) + 1 entries)"""
+    offsets = array('I', [0])
+    blob = bytearray()
+    for value in values:
+        blob += (value or '').encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def write_snapshot(path, generation, rows):
+    """Write rows of (combo_id, word, difficulty, file_path, description) as a packed snapshot"""
+    rows = sorted(rows, key=lambda row: (row[2], row[0]))
+    names = sorted(set(row[2] for row in rows))
+    codes = {name: i for i, name in enumerate(names)}
+
+    buckets = array('I', [0] * (len(names) + 1))
+    for row in rows:
+        buckets[codes[row[2]] + 1] += 1
+    for i in range(len(names)):
+        buckets[i + 1] += buckets[i]
+
+    word_offsets, word_blob = _pack_strings(row[1] for row in rows)
+    image_offsets, image_blob = _pack_strings(row[3] for row in rows)
+    desc_offsets, desc_blob = _pack_strings(row[4] for row in rows)
+    image_offsets = array('I', [o + len(word_blob) for o in image_offsets])
+    desc_offsets = array('I', [o + len(word_blob) + len(image_blob) for o in desc_offsets])
+
+    sections = [
+        array('q', [row[0] for row in rows]).tobytes(),
+        bytes(codes[row[2]] for row in rows),
+        buckets.tobytes(),
+        '\n'.join(names).encode('utf-8'),
+        word_offsets.tobytes(),
+        image_offsets.tobytes(),
+        desc_offsets.tobytes(),
+        bytes((row[1] is None) * NULL_WORD | (row[3] is None) * NULL_IMAGE | (row[4] is None) * NULL_DESC
+              for row in rows),
+        word_blob + image_blob + desc_blob,
+    ]
+
+    # Lay sections out back to back, each aligned to 8 bytes
+    offsets = []
+    position = HEADER.size
+    for data in sections:
+        offsets.append(position)
+        position += len(data) + (-len(data) % 8)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, generation, len(rows), len(names), *offsets))
+        for data in sections:
+            f.write(data + b'\0' * (-len(data) % 8))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class CatalogSnapshot:
+    """Read-only, memory-mapped view of one catalog generation"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.generation, self.count, name_count, *offsets = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        view = memoryview(self._mm)
+        section = dict(zip(SECTIONS, offsets))
+        n = self.count
+
+        self.combo_ids = view[section['combo_ids']:section['combo_ids'] + 8 * n].cast('q')
+        self.difficulty = view[section['difficulty']:section['difficulty'] + n]
+        buckets = view[section['buckets']:section['buckets'] + 4 * (name_count + 1)].cast('I')
+        names = bytes(view[section['difficulty_names']:section['word_offsets']]).rstrip(b'\0')
+        self.word_offsets = view[section['word_offsets']:section['word_offsets'] + 4 * (n + 1)].cast('I')
+        self.image_offsets = view[section['image_offsets']:section['image_offsets'] + 4 * (n + 1)].cast('I')
+        self.desc_offsets = view[section['desc_offsets']:section['desc_offsets'] + 4 * (n + 1)].cast('I')
+        self.nulls = view[section['nulls']:section['nulls'] + n]
+        self.strings = view[section['strings']:]
+
+        self.difficulty_names = names.decode('utf-8').split('\n') if name_count else []
+        self.buckets = {
+            name: (buckets[i], buckets[i + 1]) for i, name in enumerate(self.difficulty_names)
+        }
+
+    def _string(self, offsets, i, null_bit):
+        if self.nulls[i] & null_bit:
+            return None
+        return bytes(self.strings[offsets[i]:offsets[i + 1]]).decode('utf-8')
+
+    def get_combo(self, i):
+        """Return row i in the same shape as SpellingBeeDatabase.get_puzzle_combo"""
+        return {
+            'id': self.combo_ids[i],
+            'text': self._string(self.word_offsets, i, NULL_WORD),
+            'difficulty': self.difficulty_names[self.difficulty[i]],
+            'file_path': self._string(self.image_offsets, i, NULL_IMAGE),
+            'description': self._string(self.desc_offsets, i, NULL_DESC)
+        }
+
+    def get_puzzle_combo(self, difficulty, recent_combos=None):
+        """Pick a random combo of the difficulty, avoiding recent combos when possible"""
+        start, end = self.buckets.get(difficulty, (0, 0))
+        if start == end:
+            return None
+
+        recent = set(recent_combos or [])
+        for _ in range(32):
+            i = random.randrange(start, end)
+            if self.combo_ids[i] not in recent:
+                return self.get_combo(i)
+
+        # Most of the bucket is recent: choose among what is left, or anything
+        fresh = [i for i in range(start, end) if self.combo_ids[i] not in recent]
+        return self.get_combo(random.choice(fresh or range(start, end)))
+
+
+class CatalogStore:
+    """Publishes catalog generations and keeps each worker mapped to the newest one"""
+
+    def __init__(self, directory=CATALOG_DIR):
+        self.directory = directory
+        self.pointer_path = os.path.join(directory, POINTER_FILE)
+        self.snapshot = None
+        self._pointer_stat = None
+        self._stale_pointer = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def current(self):
+        """Return the newest snapshot, swapping generations when the pointer file changes"""
+        try:
+            stat = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._stale_pointer:
+            # The last publish failed and the pointer could not be removed
+            return None
+        if key != self._pointer_stat:
+            with self._lock:
+                if key != self._pointer_stat:
+                    with open(self.pointer_path) as f:
+                        name = f.read().strip()
+                    self.snapshot = CatalogSnapshot(os.path.join(self.directory, name))
+                    self._pointer_stat = key
+                    print(f"DEBUG: Mapped catalog generation {self.snapshot.generation} ({self.snapshot.count} puzzles)", flush=True)
+        return self.snapshot
+
+    def get_puzzle_combo(self, difficulty, recent_combos=None):
+        """Pick a combo from the snapshot, or None if there is no usable snapshot"""
+        try:
+            snapshot = self.current()
+        except (OSError, ValueError) as e:
+            print(f"Error mapping catalog snapshot: {e}", flush=True)
+            return None
+        if snapshot is None:
+            return None
+        return snapshot.get_puzzle_combo(difficulty, recent_combos)
+
+    def _generation_names(self):
+        """Generation files on disk, oldest first"""
+        return sorted(n for n in os.listdir(self.directory) if n.startswith('catalog-') and n.endswith('.bin'))
+
+    def _latest_generation(self):
+        # Taken from the files rather than the pointer, which is removed after a failed publish
+        names = self._generation_names()
+        return int(names[-1][len('catalog-'):-len('.bin')]) if names else 0
+
+    def publish(self, db):
+        """Write a new generation from the database and point every worker at it"""
+        conn = db.get_connection()
+        tmp_path = None
+        try:
+            # Holding a write lock keeps publications ordered with admin mutations
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('''
+                SELECT c.id, w.text, w.difficulty, i.file_path, i.description
+                FROM combos c
+                JOIN words w ON c.word_id = w.id
+                JOIN images i ON c.image_id = i.id
+            ''').fetchall()
+
+            generation = self._latest_generation() + 1
+            name = f'catalog-{generation:08d}.bin'
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(fd)
+            write_snapshot(tmp_path, generation, [tuple(row) for row in rows])
+            os.replace(tmp_path, os.path.join(self.directory, name))
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(name)
+            os.replace(tmp_path, self.pointer_path)
+            tmp_path = None
+        finally:
+            conn.rollback()
+            conn.close()
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._stale_pointer = None
+        self._prune()
+        return generation
+
+    def refresh(self, db):
+        """Publish after a catalog change; on failure, make workers read from the database instead"""
+        try:
+            return self.publish(db)
+        except Exception as e:
+            print(f"Error publishing catalog snapshot: {e}", flush=True)
+            self._invalidate()
+            return None
+
+    def _invalidate(self):
+        """Stop serving the current generation, which no longer matches the database"""
+        try:
+            # Without a pointer every worker falls back to the database
+            os.remove(self.pointer_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # At least this worker stops using the stale generation
+            stat = os.stat(self.pointer_path)
+            self._stale_pointer = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _prune(self):
+        """Remove generations older than the newest CATALOG_KEEP"""
+        for name in self._generation_names()[:-CATALOG_KEEP]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # Still mapped by a worker on a platform that forbids removal
+                pass
@@ -0,0 +1,109 @@
+import itertools
+import json
+import os
+import queue
+import threading
+
+# Live event stream configuration
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '100'))  # Events buffered per client
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_RETRY_MS = 3000  # Reconnect delay suggested to browsers
+
+
+def _as_user_id(user_id):
+    """User ids arrive as ints or strings depending on the route; compare them as ints"""
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return user_id
+
+
+class Subscription:
+    """One connected client: a filter and a bounded queue of pending events"""
+
+    def __init__(self, user_ids=None, max_queue=SSE_QUEUE_SIZE):
+        self.user_ids = {_as_user_id(u) for u in user_ids} if user_ids is not None else None
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def matches(self, event):
+        return self.user_ids is None or event['user_id'] in self.user_ids
+
+    def deliver(self, event):
+        """Queue an event; a client that falls behind gets a single 'resync' instead of a backlog"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self._queue.put_nowait({'id': event['id'], 'type': 'resync', 'user_id': None, 'data': {}})
+            except queue.Full:
+                # Another publisher refilled the queue meanwhile; its events come first
+                pass
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within the timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """In-process publish/subscribe bus for live progress events"""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_ids=None):
+        subscription = Subscription(user_ids)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def create_event(self, event_type, user_id, data):
+        return {'id': next(self._ids), 'type': event_type, 'user_id': _as_user_id(user_id), 'data': data}
+
+    def publish(self, event_type, user_id, data):
+        """Send an event to every matching subscriber without ever blocking the publisher"""
+        event = self.create_event(event_type, user_id, data)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.deliver(event)
+        return event
+
+
+def format_sse(event):
+    """Encode an event in the text/event-stream wire format"""
+    payload = dict(event['data'], user_id=event['user_id'])
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+def stream_events(subscription, bus, initial_events=()):
+    """Generator for a streaming response; unsubscribes when the client goes away"""
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        for event in initial_events:
+            yield format_sse(event)
+        while True:
+            event = subscription.get(SSE_HEARTBEAT_SECONDS)
+            if event is None:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+            else:
+                yield format_sse(event)
+    finally:
+        bus.unsubscribe(subscription)
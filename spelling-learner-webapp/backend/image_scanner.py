@@ -0,0 +1,372 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Image scanner configuration
+IMAGE_SCAN_CACHE = os.getenv('IMAGE_SCAN_CACHE', '/app/data/cache/image_scan.json')
+IMAGE_SCAN_WORKERS = int(os.getenv('IMAGE_SCAN_WORKERS', '0')) or None  # None = one per CPU
+
+# Images used by the frontend itself, not by puzzles
+RESERVED_IMAGES = {'star.jpg', 'nostar.jpg'}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif')
+
+# Only filenames like 'apple.jpg' become puzzles: the letter picker offers A-Z only
+PUZZLE_WORD = re.compile(r'[A-Za-z]+')
+
+# JPEG start-of-frame markers (the ones carrying the image dimensions)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_info(data):
+    """Walk the JPEG markers up to the frame header and check the end marker"""
+    size = None
+    frame_pos = 0
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None, 'corrupt JPEG marker'
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if pos + 9 > len(data):
+                break
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            size = (width, height)
+            frame_pos = pos
+            break
+        if marker == 0xDA:
+            break
+        pos += 2 + length
+    if size is None:
+        return None, 'JPEG frame header not found'
+    # Editors and cameras may append data after the end marker, so it need not be last
+    if data.find(b'\xff\xd9', frame_pos) < 0:
+        return size, 'truncated JPEG (missing end marker)'
+    return size, None
+
+
+def _png_info(data):
+    if len(data) < 24 or data[12:16] != b'IHDR':
+        return None, 'PNG header not found'
+    size = struct.unpack('>II', data[16:24])
+    idat = data.find(b'IDAT')
+    if idat < 0 or data.find(b'IEND', idat) < 0:
+        return size, 'truncated PNG (missing IEND chunk)'
+    return size, None
+
+
+def _skip_gif_sub_blocks(data, pos):
+    """Return the position after a chain of data sub-blocks, or None if it runs past the end"""
+    while pos < len(data):
+        length = data[pos]
+        pos += 1 + length
+        if length == 0:
+            return pos
+    return None
+
+
+def _gif_info(data):
+    """Walk the GIF blocks (extensions and images) up to the trailer"""
+    if len(data) < 13:
+        return None, 'GIF header not found'
+    size = struct.unpack('<HH', data[6:10])
+    packed = data[10]
+    pos = 13
+    if packed & 0x80:
+        pos += 3 * 2 ** ((packed & 0x07) + 1)  # Global color table
+
+    while pos is not None and pos < len(data):
+        block = data[pos]
+        if block == 0x3B:
+            return size, None
+        if block == 0x21:
+            # Extension: label byte, then sub-blocks
+            pos = _skip_gif_sub_blocks(data, pos + 2)
+        elif block == 0x2C:
+            # Image descriptor, optional local color table, LZW code size, then sub-blocks
+            if pos + 10 > len(data):
+                break
+            local = data[pos + 9]
+            pos += 10
+            if local & 0x80:
+                pos += 3 * 2 ** ((local & 0x07) + 1)
+            pos = _skip_gif_sub_blocks(data, pos + 1)
+        else:
+            return size, 'corrupt GIF block'
+    return size, 'truncated GIF (missing trailer)'
+
+
+def _webp_info(data):
+    if len(data) < 30:
+        return None, 'WebP header not found'
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[26:30])
+        size = (width & 0x3FFF, height & 0x3FFF)
+    elif chunk == b'VP8L':
+        bits = struct.unpack('<I', data[21:25])[0]
+        size = ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    elif chunk == b'VP8X':
+        size = (int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1)
+    else:
+        return None, 'unknown WebP chunk'
+    if struct.unpack('<I', data[4:8])[0] + 8 > len(data):
+        return size, 'truncated WebP'
+    return size, None
+
+
+def _avif_info(data):
+    """Walk the top-level boxes up to the end of the 'mdat' image data and read the 'ispe' dimensions"""
+    ispe = data.find(b'ispe')
+    if ispe < 0 or ispe + 16 > len(data):
+        return None, 'AVIF dimensions not found'
+    size = struct.unpack('>II', data[ispe + 8:ispe + 16])
+
+    pos = 0
+    while pos + 8 <= len(data):
+        box_size = struct.unpack('>I', data[pos:pos + 4])[0]
+        box_type = data[pos + 4:pos + 8]
+        if box_size == 1:
+            if pos + 16 > len(data):
+                return size, 'truncated AVIF'
+            box_size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+        elif box_size == 0:
+            box_size = len(data) - pos
+        if box_size < 8:
+            return size, 'corrupt AVIF box'
+        if pos + box_size > len(data):
+            return size, 'truncated AVIF'
+        pos += box_size
+        if box_type == b'mdat':
+            # Anything after the image data is ignored, as browsers do
+            return size, None
+    return size, 'AVIF image data not found'
+
+
+def _image_info(data):
+    """Detect the format from the content and return (format, (width, height), error)"""
+    if data.startswith(b'\xff\xd8'):
+        image_format = 'jpeg'
+        size, error = _jpeg_info(data)
+    elif data.startswith(b'\x89PNG\r\n\x1a\n'):
+        image_format = 'png'
+        size, error = _png_info(data)
+    elif data.startswith((b'GIF87a', b'GIF89a')):
+        image_format = 'gif'
+        size, error = _gif_info(data)
+    elif data.startswith(b'RIFF') and data[8:12] == b'WEBP':
+        image_format = 'webp'
+        size, error = _webp_info(data)
+    elif data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        image_format = 'avif'
+        size, error = _avif_info(data)
+    else:
+        image_format = None
+        size, error = None, 'unrecognised image format'
+    return image_format, size, error
+
+
+def inspect_image(path):
+    """Check format, dimensions and integrity of one file and fingerprint its content"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return {'format': None, 'width': None, 'height': None, 'sha256': None, 'error': str(e)}
+
+    try:
+        image_format, size, error = _image_info(data)
+    except (struct.error, ValueError) as e:
+        # A malformed header must not fail the whole scan
+        image_format, size, error = None, None, f'unreadable image header: {e}'
+
+    if size is not None and 0 in size and error is None:
+        error = 'image has zero width or height'
+
+    return {
+        'format': image_format,
+        'width': size[0] if size else None,
+        'height': size[1] if size else None,
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'error': error
+    }
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_path, cache):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def inspect_folder(images_folder, cache_path=IMAGE_SCAN_CACHE, workers=IMAGE_SCAN_WORKERS):
+    """Inspect every image file, re-checking only files changed since the cached run"""
+    cache = _load_cache(cache_path)
+    results = {}
+    stats = {}
+    pending = []
+
+    for filename in sorted(os.listdir(images_folder)):
+        full_path = os.path.join(images_folder, filename)
+        if (filename.startswith('.') or not filename.lower().endswith(IMAGE_EXTENSIONS)
+                or not os.path.isfile(full_path)):
+            continue
+        stat = os.stat(full_path)
+        stats[filename] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        cached = cache.get(filename)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            results[filename] = cached['result']
+        else:
+            pending.append(filename)
+
+    if pending:
+        paths = [os.path.join(images_folder, filename) for filename in pending]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results.update(zip(pending, executor.map(inspect_image, paths, chunksize=8)))
+
+    _save_cache(cache_path, {
+        filename: dict(stats[filename], result=result) for filename, result in results.items()
+    })
+
+    return results, len(pending)
+
+
+def scan_images(db, images_folder, cache_path=IMAGE_SCAN_CACHE, workers=IMAGE_SCAN_WORKERS, repair=False):
+    """Reconcile image files with the images table and optionally repair problems"""
+    results, rechecked = inspect_folder(images_folder, cache_path, workers)
+    records = db.get_image_records()
+    referenced = {record['file_path'] for record in records}
+
+    invalid = [
+        {'file': filename, 'error': result['error']}
+        for filename, result in results.items() if result['error']
+    ]
+    missing_files = [
+        record for record in records
+        if record['file_path'] not in results
+        and not os.path.isfile(os.path.join(images_folder, record['file_path']))
+    ]
+    orphan_files = [
+        filename for filename in results
+        if filename not in referenced and filename not in RESERVED_IMAGES
+    ]
+
+    by_hash = {}
+    for filename, result in results.items():
+        if result['sha256']:
+            by_hash.setdefault(result['sha256'], []).append(filename)
+    duplicates = [files for files in by_hash.values() if len(files) > 1]
+
+    report = {
+        'files': len(results),
+        'rechecked': rechecked,
+        'images': [dict(file=filename, **result) for filename, result in sorted(results.items())],
+        'invalid': invalid,
+        'missing_files': missing_files,
+        'orphan_files': orphan_files,
+        'duplicates': duplicates
+    }
+    if repair:
+        report['repairs'] = repair_images(db, images_folder, report)
+    return report
+
+
+def repair_images(db, images_folder, report):
+    """Drop rows whose file is missing and register orphan files
+
+    Invalid files are only reported: the checks are heuristic, and a file
+    browsers still display should never cost a puzzle. Each repair commits
+    on its own, so if one fails the repairs done so far are still returned
+    and the error is stored in report['repair_error'].
+    """
+    repairs = []
+    try:
+        _repair(db, images_folder, report, repairs)
+    except Exception as e:
+        report['repair_error'] = str(e)
+    return repairs
+
+
+def _repair(db, images_folder, report, repairs):
+    for record in report['missing_files']:
+        if os.path.exists(os.path.join(images_folder, record['file_path'])):
+            continue
+        if record['combo_id'] is not None:
+            db.delete_puzzle(record['combo_id'])
+            repairs.append(f"Deleted puzzle {record['combo_id']} (missing image {record['file_path']})")
+        else:
+            db.delete_image(record['image_id'])
+            repairs.append(f"Deleted image row {record['image_id']} (missing file {record['file_path']})")
+
+    # Orphans that are invalid, duplicate another file or are not a plain word are left for a person
+    invalid_files = {item['file'] for item in report['invalid']}
+    duplicated = {filename for files in report['duplicates'] for filename in files}
+    for filename in report['orphan_files']:
+        if filename in invalid_files or filename in duplicated:
+            continue
+        if not PUZZLE_WORD.fullmatch(os.path.splitext(filename)[0]):
+            continue
+        combo_id = db.add_puzzle_from_image(filename)
+        repairs.append(f'Created puzzle {combo_id} for orphan file {filename}')
+
+
+def main():
+    # Same layout as app.py: the database module lives in the mounted data folder
+    sys.path.insert(0, '/app/data')
+    from database import SpellingBeeDatabase
+    from catalog_snapshot import CatalogStore
+
+    parser = argparse.ArgumentParser(description='Check the image library against the database')
+    parser.add_argument('--images', default='/app/data/images', help='Images folder')
+    parser.add_argument('--db', default='/app/data/database/spelling_bee.db', help='Database file')
+    parser.add_argument('--cache', default=IMAGE_SCAN_CACHE, help='Fingerprint cache file')
+    parser.add_argument('--workers', type=int, default=IMAGE_SCAN_WORKERS, help='Worker processes')
+    parser.add_argument('--repair', action='store_true', help='Fix the problems that were found')
+    args = parser.parse_args()
+
+    db = SpellingBeeDatabase(args.db)
+    report = scan_images(db, args.images, args.cache, args.workers, args.repair)
+
+    print(f"Scanned {report['files']} files ({report['rechecked']} re-checked)")
+    for item in report['invalid']:
+        print(f"Invalid: {item['file']}: {item['error']}")
+    for record in report['missing_files']:
+        print(f"Missing file: {record['file_path']} (image {record['image_id']}, combo {record['combo_id']})")
+    for filename in report['orphan_files']:
+        print(f"Orphan file: {filename}")
+    for files in report['duplicates']:
+        print(f"Duplicate content: {', '.join(files)}")
+    for repair in report.get('repairs', []):
+        print(f"Repaired: {repair}")
+    if report.get('repair_error'):
+        print(f"Repair stopped: {report['repair_error']}")
+
+    if report.get('repairs'):
+        CatalogStore().refresh(db)
+    if report.get('repair_error'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+# Profiling configuration (all optional, read once at startup)
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', '0') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/app/data/profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # 0.0 - 1.0 of all requests
+PROFILE_ROUTES = [r for r in os.getenv('PROFILE_ROUTES', '').split(',') if r]  # e.g. "/api/puzzle,/api/stats"
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')  # Secret expected in the X-Profile header
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', '2')) / 1000.0
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '200'))  # Number of profiles kept on disk
+
+PROFILE_HEADER = 'X-Profile'
+
+
+class StackSampler:
+    """Samples the call stack of one thread at a fixed interval"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[self._collapse(frame)] += 1
+
+    def _collapse(self, frame):
+        """Turn a frame into a root-first 'a;b;c' line as used by flamegraph tools"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+class RequestProfiler:
+    """Profiles selected Flask requests and records database call timings"""
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self._lock = threading.Lock()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        self._instrument_db()
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+        print(f"DEBUG: Request profiling enabled, writing to {PROFILE_DIR}", flush=True)
+
+    def _should_profile(self):
+        """Decide whether the current request is profiled"""
+        if PROFILE_TOKEN and request.headers.get(PROFILE_HEADER) == PROFILE_TOKEN:
+            return True
+        if request.path in PROFILE_ROUTES:
+            return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    def _instrument_db(self):
+        """Wrap the public database methods so profiled requests record their timings"""
+        for name in dir(self.db):
+            if name.startswith('_') or name in ('get_connection', 'init_db'):
+                continue
+            method = getattr(self.db, name)
+            if callable(method):
+                setattr(self.db, name, self._timed(name, method))
+
+    def _timed(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            queries = g.get('profile_queries') if g else None
+            if queries is None or g.profile_depth > 0:
+                # Not profiled, or nested inside another database call that is already timed
+                return method(*args, **kwargs)
+            g.profile_depth += 1
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                g.profile_depth -= 1
+                queries.append({'method': name, 'ms': round((time.perf_counter() - start) * 1000, 3)})
+        return wrapper
+
+    def _before_request(self):
+        if not self._should_profile():
+            return
+        g.profile_queries = []
+        g.profile_depth = 0
+        g.profile_start = time.perf_counter()
+        g.profile_sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL)
+        g.profile_sampler.start()
+
+    def _teardown_request(self, exc):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is None:
+            return
+        sampler.stop()
+        duration_ms = (time.perf_counter() - g.pop('profile_start')) * 1000
+        queries = g.pop('profile_queries')
+        try:
+            self._write_profile(sampler.stacks, queries, duration_ms, exc)
+        except OSError as e:
+            print(f"Error writing profile: {e}", flush=True)
+
+    def _write_profile(self, stacks, queries, duration_ms, exc):
+        """Write collapsed stacks (.folded) and request metadata (.json)"""
+        route = request.path.strip('/').replace('/', '_') or 'root'
+        base = os.path.join(PROFILE_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{route}")
+
+        with open(base + '.folded', 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'method': request.method,
+                'path': request.full_path,
+                'duration_ms': round(duration_ms, 3),
+                'error': repr(exc) if exc else None,
+                'samples': sum(stacks.values()),
+                'sample_interval_ms': PROFILE_INTERVAL * 1000,
+                'db_calls': queries,
+                'db_total_ms': round(sum(q['ms'] for q in queries), 3),
+            }, f, indent=2)
+
+        self._rotate()
+
+    def _rotate(self):
+        """Keep only the newest PROFILE_KEEP profiles"""
+        with self._lock:
+            names = sorted(n[:-len('.folded')] for n in os.listdir(PROFILE_DIR) if n.endswith('.folded'))
+            stale = names[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []
+            for name in stale:
+                for ext in ('.folded', '.json'):
+                    try:
+                        os.remove(os.path.join(PROFILE_DIR, name + ext))
+                    except FileNotFoundError:
+                        pass
+
+
+def init_profiling(app, db):
+    """Attach the request profiler; when disabled no hooks are registered at all"""
+    if not PROFILE_ENABLED:
+        return None
+    return RequestProfiler(app, db)
@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+from flask import json as flask_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response compression configuration
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '500'))  # Smaller bodies are sent as-is
+COMPRESS_CACHE_ENTRIES = int(os.getenv('COMPRESS_CACHE_ENTRIES', '256'))
+COMPRESSIBLE_TYPES = {'application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript'}
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def dumps(data):
+    """Serialize to compact JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        try:
+            # Dates are left to Flask so they keep Flask's format
+            return orjson.dumps(data, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            # Types orjson does not handle (dates, Decimal, non-string keys, ...) use Flask's encoder
+            pass
+    return flask_json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def jsonify(*args, **kwargs):
+    """Drop-in replacement for flask.jsonify backed by the fast serializer"""
+    if args and kwargs:
+        raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+    data = args[0] if len(args) == 1 else (args or kwargs)
+    return current_app.response_class(dumps(data) + b'\n', mimetype=current_app.config['JSONIFY_MIMETYPE'])
+
+
+class CompressedBodyCache:
+    """Small LRU of compressed bodies keyed by content hash, so repeated bodies compress once"""
+
+    def __init__(self, max_entries=COMPRESS_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, body, encoding):
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                return compressed
+
+        compressed = compress(body, encoding)
+        with self._lock:
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def choose_encoding(accept_encodings):
+    """Pick brotli or gzip from the Accept-Encoding header, or None"""
+    if brotli is not None and accept_encodings['br'] > 0:
+        return 'br'
+    if accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def init_compression(app, cached_endpoints=()):
+    """Compress eligible responses according to Accept-Encoding
+
+    Only bodies from cached_endpoints (views whose output rarely changes)
+    are kept compressed; per-request bodies would just churn the cache.
+    """
+    cache = CompressedBodyCache()
+    cached_endpoints = set(cached_endpoints)
+
+    @app.after_request
+    def compress_response(response):
+        # Files and streams are passed through untouched
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if request.endpoint in cached_endpoints:
+            response.set_data(cache.get(body, encoding))
+        else:
+            response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return cache
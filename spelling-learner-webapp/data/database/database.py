@@ -71,7 +71,8 @@ class SpellingBeeDatabase:
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT,
-                consecutive_correct INTEGER DEFAULT 0
+                consecutive_correct INTEGER DEFAULT 0,
+                classroom TEXT
             )
         ''')
         
@@ -82,6 +83,12 @@ class SpellingBeeDatabase:
             # Column already exists
             pass
         
+        try:
+            cursor.execute('ALTER TABLE users ADD COLUMN classroom TEXT')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        
         # Add sample data if tables are empty
         cursor.execute('SELECT COUNT(*) FROM words')
         if cursor.fetchone()[0] == 0:
@@ -334,6 +341,44 @@ class SpellingBeeDatabase:
         conn.commit()
         conn.close()
     
+    def get_classroom_user_ids(self, classroom):
+        """Get the ids of all users in a classroom"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT id FROM users WHERE classroom = ?', (classroom,))
+        user_ids = [row['id'] for row in cursor.fetchall()]
+        
+        conn.close()
+        return user_ids
+    
+    def get_all_users(self):
+        """Get all users with their classroom"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT id, name, classroom FROM users ORDER BY id')
+        users = [dict(row) for row in cursor.fetchall()]
+        
+        conn.close()
+        return users
+    
+    def set_user_classroom(self, user_id, classroom):
+        """Assign a user to a classroom, creating the user row if needed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # Routes accept any user_id, so the row may not exist yet
+            cursor.execute('INSERT OR IGNORE INTO users (id, name) VALUES (?, ?)', (user_id, f'user_{user_id}'))
+            cursor.execute('UPDATE users SET classroom = ? WHERE id = ?', (classroom, user_id))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+    
     def get_user_stats(self, user_id):
         """Get statistics for a user"""
         conn = self.get_connection()
@@ -395,6 +440,43 @@ class SpellingBeeDatabase:
         conn.close()
         return puzzles
     
+    def get_image_records(self):
+        """Get all image rows with the combo that uses each one (if any)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT 
+                i.id as image_id,
+                i.file_path,
+                c.id as combo_id
+            FROM images i
+            LEFT JOIN combos c ON c.image_id = i.id
+            ORDER BY i.id
+        ''')
+        
+        records = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return records
+    
+    def delete_image(self, image_id):
+        """Delete an image row that is not used by any combo"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT COUNT(*) FROM combos WHERE image_id = ?', (image_id,))
+            if cursor.fetchone()[0] > 0:
+                raise ValueError(f"Image with id {image_id} is still used by a puzzle")
+            
+            cursor.execute('DELETE FROM images WHERE id = ?', (image_id,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+    
     def add_puzzle_from_image(self, image_filename):
         """Add a puzzle automatically based on image filename"""
         # Extract word from filename (remove extension)